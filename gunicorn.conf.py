@@ -0,0 +1,24 @@
+# Production config: python serve.py  (or gunicorn -c gunicorn.conf.py video_server:app)
+import multiprocessing
+import os
+
+bind = os.getenv("TRAILSENSE_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("TRAILSENSE_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("TRAILSENSE_THREADS", "4"))
+worker_class = "gthread"
+timeout = 120  # search plus Gemini analysis can take a while
+
+# Import the app once in the master so workers fork with it already loaded
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master before any worker is forked
+    from video_server import preload
+    preload()
+
+
+def post_worker_init(worker):
+    # Build this worker's SDK clients in the background; /ready tracks it
+    from video_server import start_warmup
+    start_warmup()
@@ -1,19 +1,51 @@
 import os
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
-from twelvelabs import TwelveLabs
 
 load_dotenv()
 
 API_KEY   = os.getenv("TWELVELABS_API_KEY")  # keep the official variable
 INDEX_ID  = os.getenv("TL_INDEX_ID")         # will be filled after creation
-
-if not API_KEY:
-    raise RuntimeError("Set twelve api key")
-
-client: TwelveLabs = TwelveLabs(api_key=API_KEY)
+REDIS_URL = os.getenv("TRAILSENSE_REDIS_URL")  # optional shared cache server
+CACHE_TTL = int(os.getenv("TRAILSENSE_CACHE_TTL", "86400"))
+SEARCH_TTL = int(os.getenv("TRAILSENSE_SEARCH_TTL", "600"))  # search hits go stale as videos are indexed
+# Canonical vibes precomputed for /discover, comma separated
+VIBES     = [v.strip() for v in os.getenv("TRAILSENSE_VIBES", "flow,jumps,technical rock,downhill").split(",") if v.strip()]
 
 BASE_DIR      = Path(__file__).resolve().parent.parent
 VIDEO_DIR     = BASE_DIR / "data" / "videos"
 META_PATH     = BASE_DIR / "data" / "trail_metadata.json"
+ATTR_PATH     = BASE_DIR / "data" / "trail_attributes.npy"
+CACHE_PATH    = BASE_DIR / "data" / "cache.sqlite3"
+SEARCH_LOG    = BASE_DIR / "data" / "search_log.jsonl"
+DISCOVER_DIR  = BASE_DIR / "data" / "discover"
 META_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+# One TwelveLabs client (and so one HTTP connection pool) per process. Built on
+# first use so importing config needs neither the SDK nor a key, and dropped in
+# forked children so workers never share sockets with the parent.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not API_KEY:
+                    raise RuntimeError("Set twelve api key")
+                from twelvelabs import TwelveLabs
+                _client = TwelveLabs(api_key=API_KEY)
+    return _client
+
+
+def _reset_client():
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client)
@@ -1,10 +1,10 @@
 from __future__ import annotations
-from config import client, MODEL
+from config import get_client, MODEL
 
 INDEX_NAME = "trailsense"
 
 def create_index(name: str = INDEX_NAME, model: str = MODEL) -> str:
-    idx = client.index.create(
+    idx = get_client().index.create(
         name=name,
         models=[{
             "name":    model,
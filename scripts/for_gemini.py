@@ -1,10 +1,10 @@
 import json
 import sys
-from .config import client, INDEX_ID
+from .config import get_client, INDEX_ID
 
 def get_video_metadata(video_id: str) -> dict:
     try:
-        videos = client.index.video.list(INDEX_ID)
+        videos = get_client().index.video.list(INDEX_ID)
         video = next((v for v in videos.root if v.id == video_id), None)
         if not video:
             raise ValueError(f"Video {video_id} not found in index {INDEX_ID}")
@@ -5,12 +5,32 @@ Analyze video summaries using Gemini AI
 
 import json
 import os
-import google.generativeai as genai
+import threading
 from .for_gemini import get_metadata_text
 
-# Configure Gemini
-genai.configure(api_key=os.getenv('GEMINI_API_KEY')) # type: ignore
-model = genai.GenerativeModel('gemini-1.5-flash') # type: ignore
+# Gemini is configured on first use, once per process, so importing this
+# module stays cheap and does not need credentials.
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Return the process-wide Gemini model, configuring the SDK on first call"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv('GEMINI_API_KEY')) # type: ignore
+                _model = genai.GenerativeModel('gemini-1.5-flash') # type: ignore
+    return _model
+
+def _reset_model():
+    global _model, _model_lock
+    _model = None
+    _model_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_model)
 
 def analyze_chat_message(message: str) -> dict:
     """Analyze a chat message to determine if user is looking for a location or asking a general question"""
@@ -40,7 +60,7 @@ def analyze_chat_message(message: str) -> dict:
         - "what's the best bike" → {{"isLocation": false, "response": "Depends on your riding style! Hardtails are great for beginners, full suspension for rougher terrain. What kind of riding are you into?"}}
         """
         
-        response = model.generate_content(prompt)
+        response = get_model().generate_content(prompt)
         
         try:
             text = response.text
@@ -105,7 +125,7 @@ def analyze_video(video_id: str, search_query: str = "") -> dict:
         If information is limited, be honest about what can and cannot be determined.
         """
         
-        response = model.generate_content(prompt)
+        response = get_model().generate_content(prompt)
         
         # Try to parse JSON from response
         try:
@@ -7,7 +7,7 @@ from pathlib import Path
 from datetime import datetime
 
 from twelvelabs import APIStatusError, TwelveLabs
-from .config import client, INDEX_ID, VIDEO_DIR, META_PATH
+from .config import get_client, INDEX_ID, VIDEO_DIR, META_PATH
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 
@@ -15,14 +15,14 @@ logging.basicConfig(level=logging.INFO, format="%(message)s")
 def _get_or_create_index(name: str) -> str:
     """Gets an existing index by name or creates a new one."""
     try:
-        indexes = client.index.list()
+        indexes = get_client().index.list()
         for i in indexes:
             if i.name == name:
                 logging.info(f"Using existing index '{i.name}' ({i.id})")
                 return i.id
 
         logging.info("Creating new index...")
-        index = client.index.create(
+        index = get_client().index.create(
             name=name,
             models=[
                 {"name": "marengo2.7", "options": ["visual"]},
@@ -42,11 +42,11 @@ def _upload_video(index_id: str, url: str) -> str | None:
     """Uploads a video to the specified index and returns the task ID."""
     logging.info(f"Uploading video from URL: {url}")
     try:
-        task = client.task.create(index_id=index_id, video_url=url, language="en")
+        task = get_client().task.create(index_id=index_id, video_url=url, language="en")
         logging.info(f"Task created with ID: {task.id}")
 
         while True:
-            task = client.task.retrieve(id=task.id)
+            task = get_client().task.retrieve(id=task.id)
             status = task.status
             logging.info(f"Task '{task.id}'' is {status}")
             if status in ("ready", "failed"):
@@ -71,7 +71,7 @@ def _analyze_with_pegasus(video_id: str, index_id: str) -> dict | None:
     )
 
     try:
-        result = client.analyze.generate(video_id=video_id, prompt=prompt)
+        result = get_client().analyze.generate(video_id=video_id, prompt=prompt)
         return {"analysis_summary": result.data}
     except APIStatusError as e:
         logging.error(f"APIStatusError during analysis: {e}")
@@ -2,15 +2,19 @@ from __future__ import annotations
 import json
 from pathlib import Path
 from typing import Any
-from .config import client, INDEX_ID, META_PATH
+from .config import get_client, INDEX_ID, META_PATH, SEARCH_TTL
 try:
     from .gemini_analysis import analyze_video
+    from .trail_attributes import normalize
+    from .shared_cache import cached, generation
 except ImportError:
     # Fallback for when running as script
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from scripts.gemini_analysis import analyze_video
+    from scripts.trail_attributes import normalize
+    from scripts.shared_cache import cached, generation
 
 
 def _meta() -> dict[str, dict]:
@@ -26,35 +30,75 @@ def _times(d: dict[str, Any]) -> tuple[Any, Any]:
     )
 
 
-def search_best(
+def search_hits(
     query: str,
     options: tuple[str, ...] = ("visual", "audio"),
-) -> dict[str, Any] | None:
+) -> list[dict[str, Any]]:
+    """Every clip the index returns for query, best first. Always hits upstream."""
     if not INDEX_ID:
         raise RuntimeError("TL_INDEX_ID missing")
 
-    resp = client.search.query(INDEX_ID, options=list(options), query_text=query)  # type: ignore
+    resp = get_client().search.query(INDEX_ID, options=list(options), query_text=query)  # type: ignore
     results = getattr(resp, "results", None) or getattr(resp, "data", [])
-    if not results:
-        return None
+    ranked = sorted(results, key=lambda r: r.score, reverse=True)
+    return [r.model_dump() if hasattr(r, "model_dump") else r.dict() for r in ranked]
 
-    best = max(results, key=lambda r: r.score)
-    d = best.model_dump() if hasattr(best, "model_dump") else best.dict()
 
-    start, end = _times(d)
-    meta = _meta().get(d["video_id"], {})
+def _best_hit(query: str, options: tuple[str, ...]) -> dict[str, Any] | None:
+    hits = search_hits(query, options)
+    return hits[0] if hits else None
+
+
+def _analysis(video_id: str, query: str) -> dict[str, Any] | None:
+    result = analyze_video(video_id, query)
+    # Failed or unparseable (raw_response) analyses are not cached so they get retried
+    if not result or "error" in result or "raw_response" in result:
+        return None
+    return result
+
 
-    # Get Gemini analysis for the video
-    gemini_result = None
+def analysis_for(video_id: str, query: str) -> dict[str, Any] | None:
+    """Gemini analysis of a video in the context of query, shared across workers."""
     try:
-        gemini_result = analyze_video(d["video_id"], query)
-        if gemini_result and "error" not in gemini_result:
-            meta.update(gemini_result)
+        return cached(f"analysis:{video_id}:{query}", lambda: _analysis(video_id, query))
     except Exception as e:
         print(f"Warning: Failed to get Gemini analysis: {e}")
+        return None
 
+
+def enrich_hit(
+    d: dict[str, Any],
+    analysis: dict[str, Any] | None = None,
+    catalog: dict[str, dict] | None = None,
+) -> dict[str, Any]:
+    """Merge a search hit with its trail metadata and Gemini analysis."""
+    start, end = _times(d)
+    meta = dict((_meta() if catalog is None else catalog).get(d["video_id"], {}))
+    if analysis:
+        meta.update(analysis)
+        meta.update(normalize(meta))
     return {**d, "start_sec": start, "end_sec": end, **meta}
 
 
+def search_best(
+    query: str,
+    options: tuple[str, ...] = ("visual", "audio"),
+) -> dict[str, Any] | None:
+    if not INDEX_ID:
+        raise RuntimeError("TL_INDEX_ID missing")
+
+    # Hits and analyses are cached across workers; metadata is merged fresh
+    # The generation is bumped when a video finishes indexing
+    d = cached(
+        f"search:{generation('search')}:{INDEX_ID}:{','.join(options)}:{query}",
+        lambda: _best_hit(query, options),
+        ttl=SEARCH_TTL,
+    )
+    if d is None:
+        return None
+
+    return enrich_hit(d, analysis_for(d["video_id"], query))
+
+
 if __name__ == "__main__":
     print(search_best("big jump on mountain bike"))
@@ -0,0 +1,182 @@
+"""
+Cross-process cache tier shared by every server worker.
+
+Values are JSON. The default backend is an SQLite file in WAL mode next to the
+metadata, so forked workers on one host share results without extra services.
+Setting TRAILSENSE_REDIS_URL switches to a Redis-compatible server instead.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    from .config import CACHE_PATH, CACHE_TTL, META_PATH, REDIS_URL
+except ImportError:
+    from config import CACHE_PATH, CACHE_TTL, META_PATH, REDIS_URL
+
+# Fraction of writes that also delete expired rows
+PRUNE_PROBABILITY = 0.01
+
+
+class SQLiteCache:
+    def __init__(self, path: Path, ttl: int = CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self.prune()
+        return conn
+
+    def prune(self) -> None:
+        self._conn().execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> Any | None:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: int | None = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, default=str), expires_at),
+        )
+        if random.random() < PRUNE_PROBABILITY:
+            self.prune()
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache")
+
+
+class RedisCache:
+    def __init__(self, url: str, ttl: int = CACHE_TTL, prefix: str = "trailsense:"):
+        import redis
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any | None:
+        value = self._redis.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: int | None = None) -> None:
+        self._redis.set(self.prefix + key, json.dumps(value, default=str), ex=self.ttl if ttl is None else ttl)
+
+    def clear(self) -> None:
+        for key in self._redis.scan_iter(self.prefix + "*"):
+            self._redis.delete(key)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> SQLiteCache | RedisCache:
+    """Process-wide cache backend, Redis if configured and usable, else SQLite."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if REDIS_URL:
+                    try:
+                        _cache = RedisCache(REDIS_URL)
+                    except Exception as e:
+                        logging.warning(f"Redis cache unavailable ({e}), falling back to SQLite cache")
+                if _cache is None:
+                    _cache = SQLiteCache(CACHE_PATH)
+    return _cache
+
+
+def cached(key: str, compute: Callable[[], Any], ttl: int | None = None) -> Any:
+    """Return the cached value for key, computing and storing it on a miss.
+    None results are not cached. Cache errors never fail the caller."""
+    try:
+        value = get_cache().get(key)
+        if value is not None:
+            return value
+    except Exception as e:
+        logging.warning(f"cache read failed for {key}: {e}")
+    value = compute()
+    if value is not None:
+        try:
+            get_cache().set(key, value, ttl)
+        except Exception as e:
+            logging.warning(f"cache write failed for {key}: {e}")
+    return value
+
+
+def generation(name: str) -> str:
+    """Current generation tag for a family of keys; bump it to invalidate them."""
+    try:
+        return str(get_cache().get(f"generation:{name}") or "0")
+    except Exception as e:
+        logging.warning(f"cache read failed for generation {name}: {e}")
+        return "0"
+
+
+def bump_generation(name: str) -> None:
+    try:
+        get_cache().set(f"generation:{name}", str(time.time()))
+    except Exception as e:
+        logging.warning(f"cache write failed for generation {name}: {e}")
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Replace path with text so concurrent readers never see a partial file."""
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+    ) as f:
+        f.write(text)
+    try:
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+@contextmanager
+def metadata_lock():
+    """Exclusive lock held across a metadata read-modify-write, across processes."""
+    lock_path = META_PATH.with_name(META_PATH.name + ".lock")
+    with open(lock_path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _reset_cache():
+    global _cache, _cache_lock
+    _cache = None
+    _cache_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_cache)
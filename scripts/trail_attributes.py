@@ -0,0 +1,321 @@
+"""
+Normalize free-form trail analysis into typed attributes and keep a columnar
+side file next to the metadata so the catalog can be faceted and sorted
+without re-parsing strings on every request.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import tempfile
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+
+class SkillLevel(IntEnum):
+    UNKNOWN = 0
+    BEGINNER = 1
+    INTERMEDIATE = 2
+    ADVANCED = 3
+    EXPERT = 4
+
+
+# Controlled terrain vocabulary. The position of a tag is its bit in the
+# packed terrain mask, so only ever append to this tuple.
+TERRAIN_TAGS: tuple[str, ...] = (
+    "flow",
+    "technical",
+    "downhill",
+    "rocky",
+    "rooty",
+    "jumps",
+    "drops",
+    "berms",
+    "flat",
+    "climb",
+    "singletrack",
+    "bike park",
+)
+
+_TERRAIN_SYNONYMS: dict[str, str] = {
+    "flowy": "flow",
+    "flow trail": "flow",
+    "tech": "technical",
+    "dh": "downhill",
+    "descent": "downhill",
+    "rock": "rocky",
+    "rocks": "rocky",
+    "technical rock": "rocky",
+    "root": "rooty",
+    "roots": "rooty",
+    "jump": "jumps",
+    "jump line": "jumps",
+    "drop": "drops",
+    "berm": "berms",
+    "climbing": "climb",
+    "uphill": "climb",
+    "single track": "singletrack",
+    "bikepark": "bike park",
+    "park": "bike park",
+}
+
+UNKNOWN_DIFFICULTY = -1
+
+ATTR_DTYPE = np.dtype([
+    ("video_id", "U32"),
+    ("difficulty", "i1"),
+    ("skill_level", "u1"),
+    ("terrain_mask", "u4"),
+    ("indexed_at", "datetime64[s]"),
+])
+
+_OUT_OF_TEN = re.compile(r"(\d+(?:\.\d+)?)\s*(?:/|out of)\s*10\b")
+_BARE_NUMBER = re.compile(r"\s*(\d+(?:\.\d+)?)\s*")
+_RANGE = re.compile(r"\d\s*(?:-|–|to)\s*\d")
+
+
+def normalize_difficulty(raw: Any) -> int | None:
+    """Parse "4/10", "4", 4 or 4.5 into an integer 1-10; None if unknown.
+
+    Ranges such as "6-8" or "3/10 - 5/10", and the prompt placeholder
+    "1-10 or 'Unknown'", are treated as unknown rather than guessed.
+    """
+    if raw is None or isinstance(raw, bool):
+        return None
+    if isinstance(raw, (int, float)):
+        value = float(raw)
+    else:
+        text = str(raw)
+        if _RANGE.search(text):
+            return None
+        match = _OUT_OF_TEN.search(text) or _BARE_NUMBER.fullmatch(text)
+        if match is None:
+            return None
+        value = float(match.group(1))
+    if not 0 < value <= 10:
+        return None
+    # Round halves up consistently; round() would send 4.5 to 4 but 5.5 to 6
+    return max(1, math.floor(value + 0.5))
+
+
+def normalize_skill_level(raw: Any, difficulty: int | None = None) -> SkillLevel:
+    """Map a skill label to SkillLevel, falling back to the difficulty band."""
+    if isinstance(raw, str):
+        label = raw.strip().upper()
+        for level in SkillLevel:
+            if level is not SkillLevel.UNKNOWN and level.name in label:
+                return level
+    if difficulty is None:
+        return SkillLevel.UNKNOWN
+    if difficulty <= 3:
+        return SkillLevel.BEGINNER
+    if difficulty <= 6:
+        return SkillLevel.INTERMEDIATE
+    if difficulty <= 8:
+        return SkillLevel.ADVANCED
+    return SkillLevel.EXPERT
+
+
+def normalize_terrain(*raw: Any) -> list[str]:
+    """Extract controlled-vocabulary tags from free-text terrain descriptions."""
+    found: set[str] = set()
+    for text in raw:
+        if not isinstance(text, str):
+            continue
+        for part in re.split(r"[,/;&]|\band\b|\bwith\b", text.lower()):
+            phrase = re.sub(r"[^a-z ]", " ", part)
+            phrase = " ".join(phrase.split())
+            if not phrase:
+                continue
+            candidates = [phrase, *phrase.split()]
+            candidates += [" ".join(p) for p in zip(phrase.split(), phrase.split()[1:])]
+            for word in candidates:
+                tag = _TERRAIN_SYNONYMS.get(word, word)
+                if tag in TERRAIN_TAGS:
+                    found.add(tag)
+    return [tag for tag in TERRAIN_TAGS if tag in found]
+
+
+def normalize(entry: dict) -> dict:
+    """Typed attributes for a metadata entry or a Gemini analysis result."""
+    difficulty = normalize_difficulty(entry.get("difficulty_rating"))
+    skill = normalize_skill_level(entry.get("recommended_skill_level"), difficulty)
+    terrain = normalize_terrain(entry.get("terrain"), entry.get("terrain_type"))
+    return {
+        "difficulty": difficulty,
+        "skill_level": skill.name.lower(),
+        "terrain_tags": terrain,
+    }
+
+
+def terrain_mask(tags: Iterable[str]) -> int:
+    mask = 0
+    for tag in tags:
+        if tag in TERRAIN_TAGS:
+            mask |= 1 << TERRAIN_TAGS.index(tag)
+    return mask
+
+
+def _indexed_at(value: Any) -> np.datetime64:
+    if not value:
+        return np.datetime64("NaT", "s")
+    try:
+        return np.datetime64(str(value).rstrip("Z"), "s")
+    except ValueError:
+        return np.datetime64("NaT", "s")
+
+
+def build_attributes(meta: list[dict]) -> np.ndarray:
+    """Build the structured attribute array for every entry in the catalog."""
+    arr = np.zeros(len(meta), dtype=ATTR_DTYPE)
+    for i, entry in enumerate(meta):
+        attrs = normalize(entry)
+        difficulty = attrs["difficulty"]
+        arr[i] = (
+            entry["video_id"],
+            UNKNOWN_DIFFICULTY if difficulty is None else difficulty,
+            SkillLevel[attrs["skill_level"].upper()],
+            terrain_mask(attrs["terrain_tags"]),
+            _indexed_at(entry.get("indexed_at")),
+        )
+    return arr
+
+
+def save_attributes(arr: np.ndarray, path: Path) -> None:
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+    ) as f:
+        np.save(f, arr, allow_pickle=False)
+    try:
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+def write_attributes(meta: list[dict], path: Path) -> np.ndarray:
+    arr = build_attributes(meta)
+    save_attributes(arr, path)
+    return arr
+
+
+def load_attributes(path: Path, meta_path: Path) -> np.ndarray:
+    """Load the side file, or build the array in memory if the file is missing
+    or older than the metadata.
+
+    The file is memory-mapped read-only, so every worker on the host shares the
+    same pages. Only metadata writers (holding metadata_lock) write it, replacing
+    it atomically and leaving existing maps valid.
+    """
+    if not meta_path.exists():
+        return np.zeros(0, dtype=ATTR_DTYPE)
+    if path.exists() and path.stat().st_mtime >= meta_path.stat().st_mtime:
+        try:
+            arr = np.load(path, mmap_mode="r", allow_pickle=False)
+        except ValueError:
+            # Empty arrays cannot be mapped; fall through and build in memory
+            arr = None
+        if arr is not None and arr.dtype == ATTR_DTYPE:
+            return arr
+    return build_attributes(json.loads(meta_path.read_text()))
+
+
+def select(
+    arr: np.ndarray,
+    min_difficulty: int | None = None,
+    max_difficulty: int | None = None,
+    skill_levels: Iterable[str] = (),
+    terrain: Iterable[str] = (),
+) -> np.ndarray:
+    """Boolean mask of rows matching every filter. Terrain values may be synonyms
+    ("rock") and must all be present; unknown terrain raises ValueError."""
+    keep = np.ones(len(arr), dtype=bool)
+    if min_difficulty is not None:
+        keep &= arr["difficulty"] >= min_difficulty
+    if max_difficulty is not None:
+        keep &= (arr["difficulty"] <= max_difficulty) & (arr["difficulty"] != UNKNOWN_DIFFICULTY)
+    levels = [SkillLevel[s.upper()] for s in skill_levels]
+    if levels:
+        keep &= np.isin(arr["skill_level"], levels)
+    tags = []
+    for value in terrain:
+        mapped = normalize_terrain(value)
+        if not mapped:
+            raise ValueError(f"Unknown terrain {value!r}")
+        tags += mapped
+    wanted = terrain_mask(tags)
+    if wanted:
+        keep &= (arr["terrain_mask"] & wanted) == wanted
+    return keep
+
+
+def filter_sort(
+    arr: np.ndarray,
+    sort: str | None = None,
+    descending: bool = False,
+    **filters: Any,
+) -> list[str]:
+    """Video ids matching the filters, ordered by a column. Unknowns sort last."""
+    rows = arr[select(arr, **filters)]
+    if sort:
+        if sort not in ("difficulty", "skill_level", "indexed_at"):
+            raise ValueError(f"Cannot sort by {sort!r}")
+        if sort == "indexed_at":
+            missing = np.isnat(rows[sort])
+        elif sort == "difficulty":
+            missing = rows[sort] == UNKNOWN_DIFFICULTY
+        else:
+            missing = rows[sort] == SkillLevel.UNKNOWN
+        key = rows[sort].astype("i8")
+        if descending:
+            key = -key
+        rows = rows[np.lexsort((key, missing))]
+    return rows["video_id"].tolist()
+
+
+def facet_counts(arr: np.ndarray) -> dict[str, dict[str, int]]:
+    """Catalog-wide counts per difficulty, skill level and terrain tag."""
+    difficulty = np.bincount(arr["difficulty"] + 1, minlength=12)
+    skill = np.bincount(arr["skill_level"], minlength=len(SkillLevel))
+    bits = (arr["terrain_mask"][:, None] >> np.arange(len(TERRAIN_TAGS), dtype="u4")) & 1
+    terrain = bits.sum(axis=0)
+    return {
+        "difficulty": {
+            ("unknown" if d == UNKNOWN_DIFFICULTY else str(d)): int(difficulty[d + 1])
+            for d in range(UNKNOWN_DIFFICULTY, 11)
+            if difficulty[d + 1]
+        },
+        "skill_level": {
+            level.name.lower(): int(skill[level]) for level in SkillLevel if skill[level]
+        },
+        "terrain": {
+            tag: int(terrain[i]) for i, tag in enumerate(TERRAIN_TAGS) if terrain[i]
+        },
+    }
+
+
+def main():
+    try:
+        from .config import META_PATH, ATTR_PATH
+        from .shared_cache import atomic_write_text, metadata_lock
+    except ImportError:
+        from config import META_PATH, ATTR_PATH
+        from shared_cache import atomic_write_text, metadata_lock
+
+    with metadata_lock():
+        meta = json.loads(META_PATH.read_text()) if META_PATH.exists() else []
+        for entry in meta:
+            entry.update(normalize(entry))
+        atomic_write_text(META_PATH, json.dumps(meta, indent=2))
+        arr = write_attributes(meta, ATTR_PATH)
+    print(json.dumps(facet_counts(arr), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Precompute top-K clips for the canonical "trending vibes" and the most common
+logged searches, and store them as versioned snapshots served by /discover.
+
+Run it on a schedule, e.g. from cron:
+    python -m scripts.trending
+or keep it running:
+    python -m scripts.trending --interval 3600
+"""
+
+from __future__ import annotations
+
+import argparse
+import fcntl
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .config import DISCOVER_DIR, META_PATH, SEARCH_LOG, VIBES
+from .semantic_search import analysis_for, enrich_hit, search_hits
+from .shared_cache import atomic_write_text
+
+KEEP_SNAPSHOTS = 10
+# The keyword log is rotated past this size, keeping one previous file
+SEARCH_LOG_MAX_BYTES = 1_000_000
+
+
+def log_query(query: Any) -> None:
+    """Append a user search to the keyword log read by the precompute job.
+    Best-effort: bad input or I/O errors never affect the search itself."""
+    if not isinstance(query, str):
+        return
+    query = " ".join(query.lower().split())
+    if not query:
+        return
+    line = json.dumps({"query": query, "at": datetime.now(timezone.utc).isoformat(timespec="seconds")})
+    try:
+        if SEARCH_LOG.exists() and SEARCH_LOG.stat().st_size > SEARCH_LOG_MAX_BYTES:
+            _rotate_log()
+        # Single small appends are atomic, so workers can share the file
+        with open(SEARCH_LOG, "a") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logging.warning(f"could not log search query: {e}")
+
+
+def _rotated_log() -> Path:
+    return SEARCH_LOG.with_name(SEARCH_LOG.name + ".1")
+
+
+def _rotate_log() -> None:
+    # Workers race to rotate; re-check under the lock so only one of them moves
+    # the full log and the others don't clobber .1 with the fresh one
+    lock_path = SEARCH_LOG.with_name(SEARCH_LOG.name + ".lock")
+    with open(lock_path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            if SEARCH_LOG.exists() and SEARCH_LOG.stat().st_size > SEARCH_LOG_MAX_BYTES:
+                SEARCH_LOG.replace(_rotated_log())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def top_keywords(n: int) -> list[str]:
+    """The n most frequent logged searches, from the current and previous log."""
+    if n <= 0:
+        return []
+    counts: Counter[str] = Counter()
+    for path in (_rotated_log(), SEARCH_LOG):
+        if not path.exists():
+            continue
+        with open(path) as f:
+            for line in f:
+                try:
+                    counts[json.loads(line)["query"]] += 1
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+    return [query for query, _ in counts.most_common(n)]
+
+
+def _snapshot_paths() -> list[Path]:
+    return sorted(DISCOVER_DIR.glob("*.json")) if DISCOVER_DIR.exists() else []
+
+
+def latest_snapshot_path() -> Path | None:
+    paths = _snapshot_paths()
+    return paths[-1] if paths else None
+
+
+def load_latest_snapshot() -> dict | None:
+    path = latest_snapshot_path()
+    return json.loads(path.read_text()) if path else None
+
+
+def _save_snapshot(snapshot: dict) -> Path:
+    DISCOVER_DIR.mkdir(parents=True, exist_ok=True)
+    path = DISCOVER_DIR / f"{snapshot['version']}.json"
+    atomic_write_text(path, json.dumps(snapshot, indent=2, default=str))
+    for old in _snapshot_paths()[:-KEEP_SNAPSHOTS]:
+        old.unlink()
+    return path
+
+
+def _usable(analysis: Any) -> bool:
+    return bool(analysis) and "error" not in analysis and "raw_response" not in analysis
+
+
+def _vibe_entry(
+    vibe: str,
+    k: int,
+    catalog: dict[str, dict],
+    searchable: list[str],
+    reuse: dict[str, dict],
+) -> dict:
+    """Top-k clips for vibe. Analyses in reuse are kept instead of asking Gemini again.
+
+    The entry records the searchable set it was computed against, and is marked
+    incomplete if any clip is missing its analysis so the next run retries it.
+    """
+    clips = []
+    analyses: dict[str, dict] = {}
+    for hit in search_hits(vibe)[:k]:
+        video_id = hit["video_id"]
+        if video_id not in analyses:
+            analysis = reuse.get(video_id)
+            if not _usable(analysis):
+                analysis = analysis_for(video_id, vibe)
+            if _usable(analysis):
+                analyses[video_id] = analysis
+        clips.append(enrich_hit(hit, analyses.get(video_id), catalog))
+    return {
+        "clips": clips,
+        "analyses": analyses,
+        "searchable": searchable,
+        "complete": all(clip["video_id"] in analyses for clip in clips),
+    }
+
+
+def build_snapshot(vibes: list[str], k: int, previous: dict | None = None) -> dict:
+    """Build a snapshot, reusing the previous one wherever nothing changed.
+
+    A vibe is reused only if it was computed against the current set of
+    searchable videos and is complete. Otherwise it is searched again, and
+    Gemini is only asked about videos without a usable analysis for it. A vibe
+    whose search fails keeps its previous entry, which still records the old
+    searchable set, so the next run retries it.
+    """
+    meta = json.loads(META_PATH.read_text()) if META_PATH.exists() else []
+    catalog = {m["video_id"]: m for m in meta}
+    # Uploads stay "indexing" until the webhook fires; they can't be found yet
+    searchable = sorted(
+        m["video_id"] for m in meta if m.get("status", "indexed") == "indexed"
+    )
+
+    previous = previous or {}
+    prev_vibes = previous.get("vibes", {}) if previous.get("top_k") == k else {}
+
+    entries = {}
+    for vibe in vibes:
+        prev = prev_vibes.get(vibe)
+        if prev is not None and prev.get("complete") and prev.get("searchable") == searchable:
+            entries[vibe] = prev
+            continue
+        logging.info(f"precomputing '{vibe}'")
+        try:
+            reuse = prev.get("analyses", {}) if prev else {}
+            entries[vibe] = _vibe_entry(vibe, k, catalog, searchable, reuse)
+        except Exception as e:
+            logging.error(f"search for '{vibe}' failed: {e}")
+            if prev is not None:
+                entries[vibe] = prev
+
+    now = datetime.now(timezone.utc)
+    return {
+        "version": now.strftime("%Y%m%dT%H%M%SZ"),
+        "created_at": now.isoformat(timespec="seconds"),
+        "top_k": k,
+        "vibes": entries,
+    }
+
+
+def run(vibes: list[str], k: int, keywords: int) -> Path | None:
+    """Precompute once. Returns the new snapshot path, or None if nothing changed."""
+    wanted = list(dict.fromkeys([*vibes, *top_keywords(keywords)]))
+    previous = load_latest_snapshot()
+    snapshot = build_snapshot(wanted, k, previous)
+    if previous and snapshot["vibes"] == previous.get("vibes"):
+        logging.info("discover snapshot unchanged")
+        return None
+    path = _save_snapshot(snapshot)
+    logging.info(f"wrote discover snapshot {path.name}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the /discover catalog")
+    parser.add_argument("vibes", nargs="*", default=VIBES, help="vibes to precompute")
+    parser.add_argument("--top-k", type=int, default=5, help="clips per vibe")
+    parser.add_argument("--keywords", type=int, default=10, help="most frequent logged searches to add")
+    parser.add_argument("--interval", type=int, default=0, help="repeat every N seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    while True:
+        run(args.vibes, args.top_k, args.keywords)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
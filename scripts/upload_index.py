@@ -6,7 +6,9 @@ from datetime import datetime
 
 from twelvelabs import APIStatusError
 
-from config import client, INDEX_ID, VIDEO_DIR, META_PATH
+from config import get_client, INDEX_ID, VIDEO_DIR, META_PATH, ATTR_PATH
+from trail_attributes import normalize, write_attributes
+from shared_cache import atomic_write_text, metadata_lock
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 
@@ -16,13 +18,13 @@ def _get_or_create_index(name: str) -> str:
         logging.info(f"Using index from environment variable: {INDEX_ID}")
         return INDEX_ID
     try:
-        indexes = client.index.list()
+        indexes = get_client().index.list()
         for i in indexes:
             if i.name == name:
                 logging.info(f"using existing index {i.name} ({i.id})")
                 return i.id
         logging.info("creating new index")
-        index = client.index.create(
+        index = get_client().index.create(
             name=name,
             models=[
                 {"name": "marengo2.7", "options": ["visual"]},
@@ -42,7 +44,8 @@ def _load() -> list[dict]:
 
 
 def _save(meta: list[dict]):
-    META_PATH.write_text(json.dumps(meta, indent=2))
+    atomic_write_text(META_PATH, json.dumps(meta, indent=2))
+    write_attributes(meta, ATTR_PATH)
 
 
 def _analyze_video(video_id: str, index_id: str) -> dict:
@@ -57,7 +60,7 @@ def _analyze_video(video_id: str, index_id: str) -> dict:
         '\\"description\\" (a short summary of the video).'
     )
     try:
-        result = client.analyze(video_id=video_id, index_id=index_id, prompt=prompt)
+        result = get_client().analyze(video_id=video_id, index_id=index_id, prompt=prompt)
 
         analysis_data = json.loads(result.data)
 
@@ -80,7 +83,7 @@ def _analyze_video(video_id: str, index_id: str) -> dict:
 
 def _upload(index_id: str, path: Path):
     try:
-        task = client.task.create(index_id=index_id, file=str(path))  # type: ignore
+        task = get_client().task.create(index_id=index_id, file=str(path))  # type: ignore
     except Exception as exc:      
         logging.error(f"create() failed: {exc}")
         return None
@@ -93,7 +96,7 @@ def _upload(index_id: str, path: Path):
             return None
         logging.info(f"{task.id} → {task.status}")
         time.sleep(5)
-        task = client.task.retrieve(task.id)        # refresh
+        task = get_client().task.retrieve(task.id)        # refresh
 
 
 def main():
@@ -113,7 +116,7 @@ def main():
 
         analysis = _analyze_video(task.video_id, index_id)
 
-        meta.append({
+        entry = {
             "filename": video.name,
             "video_id": task.video_id,
             "trail_name": video.stem.replace("_", " ").title(),
@@ -127,8 +130,13 @@ def main():
             "difficulty_rating": analysis.get("difficulty_rating"),
             "terrain": analysis.get("terrain"),
             "description": analysis.get("description"),
-        })
-        _save(meta)
+        }
+        entry.update(normalize(entry))
+        # Re-read under the lock so entries the server wrote meanwhile survive
+        with metadata_lock():
+            meta = _load()
+            meta.append(entry)
+            _save(meta)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,14 @@
+"""
+Production entry point: runs video_server under pre-fork gunicorn workers.
+Extra arguments are passed through to gunicorn, e.g. python serve.py -w 8
+"""
+
+import sys
+from pathlib import Path
+
+from gunicorn.app.wsgiapp import run
+
+if __name__ == "__main__":
+    config = Path(__file__).with_name("gunicorn.conf.py")
+    sys.argv = ["gunicorn", "-c", str(config), *sys.argv[1:], "video_server:app"]
+    run()
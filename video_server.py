@@ -1,36 +1,226 @@
 from flask import Flask, jsonify, send_from_directory, request
 from flask_cors import CORS
+import importlib
 import json
 import os
+import threading
 from pathlib import Path
 from datetime import datetime
-from scripts.config import VIDEO_DIR, META_PATH
+from scripts.config import VIDEO_DIR, META_PATH, ATTR_PATH, API_KEY, INDEX_ID, get_client
 from scripts.semantic_search import search_best
-from scripts.gemini_analysis import analyze_chat_message
+from scripts.gemini_analysis import analyze_chat_message, get_model
+from scripts.trail_attributes import normalize, load_attributes, write_attributes, filter_sort, facet_counts
+from scripts.shared_cache import atomic_write_text, bump_generation, metadata_lock
+from scripts.trending import log_query, latest_snapshot_path
 
 app = Flask(__name__)
 CORS(app)
 
+# In-process catalog cache, reloaded whenever the metadata file changes on disk
+_cache = {"mtime": None, "metadata": [], "attributes": None}
+_cache_lock = threading.Lock()
+
+# Latest /discover snapshot, keyed by its file name
+_discover = {"name": None, "snapshot": None}
+
+# Background warm-up state reported by /ready
+_ready = threading.Event()
+_warm_status = {}
+_warm_lock = threading.Lock()
+_warm_thread = None
+
 # Helper functions
 
-def load_metadata():
+def read_metadata():
+    """Read metadata straight from disk. Use this before modifying and saving."""
     if not META_PATH.exists():
         return []
     return json.loads(META_PATH.read_text())
 
+def _refresh_cache():
+    mtime = META_PATH.stat().st_mtime if META_PATH.exists() else None
+    if _cache["attributes"] is not None and mtime == _cache["mtime"]:
+        return
+    with _cache_lock:
+        if _cache["attributes"] is not None and mtime == _cache["mtime"]:
+            return
+        _cache["metadata"] = read_metadata()
+        _cache["attributes"] = load_attributes(ATTR_PATH, META_PATH)
+        _cache["mtime"] = mtime
+
+def load_metadata():
+    """Cached metadata list. Treat as read-only."""
+    _refresh_cache()
+    return _cache["metadata"]
+
+def load_catalog_attributes():
+    _refresh_cache()
+    return _cache["attributes"]
+
+def save_metadata(metadata):
+    """Write metadata and its attribute side file. Call under metadata_lock()."""
+    atomic_write_text(META_PATH, json.dumps(metadata, indent=2))
+    write_attributes(metadata, ATTR_PATH)
+
+def load_discover():
+    path = latest_snapshot_path()
+    if path is None:
+        return None
+    if _discover["name"] != path.name:
+        _discover["snapshot"] = json.loads(path.read_text())
+        _discover["name"] = path.name
+    return _discover["snapshot"]
+
+def warm():
+    """Load the catalog and build the SDK clients, recording what succeeded."""
+    status = {}
+    try:
+        _refresh_cache()
+        status["metadata"] = "ready"
+    except Exception as e:
+        status["metadata"] = f"failed: {e}"
+    try:
+        status["discover"] = "ready" if load_discover() else "no snapshot"
+    except Exception as e:
+        status["discover"] = f"failed: {e}"
+    clients = (
+        ("twelvelabs", bool(API_KEY and INDEX_ID), get_client),
+        ("gemini", bool(os.getenv("GEMINI_API_KEY")), get_model),
+    )
+    for name, configured, factory in clients:
+        if not configured:
+            status[name] = "not configured"
+            continue
+        try:
+            factory()
+            status[name] = "ready"
+        except Exception as e:
+            status[name] = f"unavailable: {e}"
+    _warm_status.update(status)
+    _ready.set()
+
+def start_warmup():
+    """Warm caches in a background thread, once per process."""
+    global _warm_thread
+    if _ready.is_set() or _warm_thread is not None:
+        return
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=warm, name="warmup", daemon=True)
+            _warm_thread.start()
+
+def preload():
+    """Pre-fork hook for the master: import the SDKs and load the catalog so
+    forked workers inherit them. Clients are not built here because they are
+    dropped at fork; each worker builds its own via start_warmup()."""
+    for module in ("twelvelabs", "google.generativeai"):
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    _refresh_cache()
+    load_discover()
+
+def _reset_warmup():
+    # A forked worker reports and warms its own state, not the parent's
+    global _ready, _warm_lock, _warm_thread
+    _ready = threading.Event()
+    _warm_lock = threading.Lock()
+    _warm_thread = None
+    _warm_status.clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_warmup)
+
+def _csv_arg(name):
+    value = request.args.get(name, "")
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def _difficulty_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        difficulty = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer from 1 to 10")
+    if not 1 <= difficulty <= 10:
+        raise ValueError(f"{name} must be an integer from 1 to 10")
+    return difficulty
+
 def get_video_meta(video_id):
     for video in load_metadata():
         if video["video_id"] == video_id:
             return video
     return None
 
+@app.before_request
+def _ensure_warmup():
+    start_warmup()
+
 @app.route("/")
 def health():
     return jsonify({"message": "TrailSense Video Server (Flask)", "status": "healthy"})
 
+# Clients each feature needs, for /ready?require=...
+READY_REQUIREMENTS = {
+    "search": ("twelvelabs",),
+    "chat": ("gemini",),
+}
+
+@app.route("/ready")
+def ready():
+    """Readiness for load balancers, separate from the / liveness check.
+
+    503 while warming, if metadata failed to load, or if a configured client
+    failed to build. Clients without credentials don't block readiness unless
+    requested: ?require=search needs TwelveLabs, ?require=chat needs Gemini.
+    """
+    components = dict(_warm_status)
+    if not _ready.is_set():
+        return jsonify({"status": "warming", "components": components}), 503
+
+    required = set()
+    for feature in _csv_arg("require"):
+        if feature not in READY_REQUIREMENTS:
+            return jsonify({"error": f"Unknown requirement: {feature}"}), 400
+        required.update(READY_REQUIREMENTS[feature])
+
+    failing = [
+        name for name, state in components.items()
+        if (name == "metadata" and state != "ready")
+        or state.startswith("unavailable")
+        or (name in required and state != "ready")
+    ]
+    if failing:
+        return jsonify({"status": "not ready", "failing": failing, "components": components}), 503
+    return jsonify({"status": "ready", "components": components})
+
 @app.route("/videos")
 def list_videos():
-    return jsonify(load_metadata())
+    metadata = load_metadata()
+    if not request.args:
+        return jsonify(metadata)
+
+    try:
+        ids = filter_sort(
+            load_catalog_attributes(),
+            sort=request.args.get("sort"),
+            descending=request.args.get("order") == "desc",
+            min_difficulty=_difficulty_arg("min_difficulty"),
+            max_difficulty=_difficulty_arg("max_difficulty"),
+            skill_levels=_csv_arg("skill_level"),
+            terrain=_csv_arg("terrain"),
+        )
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid filter: {e}"}), 400
+
+    by_id = {video["video_id"]: video for video in metadata}
+    return jsonify([by_id[video_id] for video_id in ids if video_id in by_id])
+
+@app.route("/videos/facets")
+def video_facets():
+    return jsonify(facet_counts(load_catalog_attributes()))
 
 @app.route("/videos/<video_id>")
 def get_video(video_id):
@@ -54,6 +244,7 @@ def search():
     data = request.get_json()
     query = data.get("query", "")
     options = data.get("options", ["visual", "audio"])
+    log_query(query)
     
     try:
         # Use the existing search_best function from scripts
@@ -63,6 +254,26 @@ def search():
         return jsonify(result)
     except Exception as e:
         error_message = str(e)
+        return jsonify({"error": error_message}), 500
+
+@app.route("/discover")
+def discover():
+    # Served purely from the precomputed snapshot; no upstream calls here
+    snapshot = load_discover()
+    if not snapshot:
+        return jsonify({"error": "No discover snapshot yet"}), 404
+
+    vibes = {vibe: entry["clips"] for vibe, entry in snapshot["vibes"].items()}
+    vibe = request.args.get("vibe")
+    if vibe is not None:
+        if vibe not in vibes:
+            return jsonify({"error": "Vibe not found"}), 404
+        vibes = {vibe: vibes[vibe]}
+    return jsonify({
+        "version": snapshot["version"],
+        "created_at": snapshot["created_at"],
+        "vibes": vibes,
+    })
 
 @app.route("/gemini/chat", methods=["POST"])
 def gemini_chat():
@@ -106,7 +317,6 @@ def upload_video():
         description = request.form.get('description', '')
         
         # Create metadata entry
-        metadata = load_metadata()
         new_entry = {
             "filename": filename,
             "video_id": f"upload_{timestamp}",
@@ -122,12 +332,13 @@ def upload_video():
             "difficulty_rating": None,
             "description": description
         }
-        
-        metadata.append(new_entry)
+        new_entry.update(normalize(new_entry))
         
         # Save updated metadata
-        with open(META_PATH, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        with metadata_lock():
+            metadata = read_metadata()
+            metadata.append(new_entry)
+            save_metadata(metadata)
         
         return jsonify({
             "message": "Video uploaded successfully",
@@ -153,39 +364,43 @@ def webhook():
 
     print(f"Received webhook event: {event_type} for video ID: {video_id}")
 
-    metadata = load_metadata()
-    video_found = False
-    for video in metadata:
-        if video.get("video_id") == video_id:
-            video_found = True
-            if event_type == "video.index.ready":
-                video["status"] = "indexed"
-                video_metadata = webhook_data.get("metadata", {})
-                video["duration"] = video_metadata.get("duration")
-                print(f"Video {video_id} has been indexed successfully.")
-            elif event_type == "video.index.failed":
-                video["status"] = "failed"
-                print(f"Video {video_id} failed to index.")
-            else:
-                print(f"Received unhandled event type: {event_type}")
-                return jsonify({"status": "event type unhandled"})
-
-            break
-
-    if not video_found:
-        print(f"Webhook for unknown video ID: {video_id}")
-        # We still return 200 so TwelveLabs doesn't keep retrying.
-        return jsonify({"status": "video not found, but acknowledged"})
-
-    # Save updated metadata
-    try:
-        with open(META_PATH, 'w') as f:
-            json.dump(metadata, f, indent=2)
-    except Exception as e:
-        print(f"Error saving metadata: {e}")
-        return jsonify({"error": "Failed to update metadata"}), 500
+    # Hold the lock so concurrent workers cannot drop each other's updates
+    with metadata_lock():
+        metadata = read_metadata()
+        video_found = False
+        for video in metadata:
+            if video.get("video_id") == video_id:
+                video_found = True
+                if event_type == "video.index.ready":
+                    video["status"] = "indexed"
+                    video_metadata = webhook_data.get("metadata", {})
+                    video["duration"] = video_metadata.get("duration")
+                    # Cached search hits predate this video; start a new generation
+                    bump_generation("search")
+                    print(f"Video {video_id} has been indexed successfully.")
+                elif event_type == "video.index.failed":
+                    video["status"] = "failed"
+                    print(f"Video {video_id} failed to index.")
+                else:
+                    print(f"Received unhandled event type: {event_type}")
+                    return jsonify({"status": "event type unhandled"})
+
+                break
+
+        if not video_found:
+            print(f"Webhook for unknown video ID: {video_id}")
+            # We still return 200 so TwelveLabs doesn't keep retrying.
+            return jsonify({"status": "video not found, but acknowledged"})
+
+        # Save updated metadata
+        try:
+            save_metadata(metadata)
+        except Exception as e:
+            print(f"Error saving metadata: {e}")
+            return jsonify({"error": "Failed to update metadata"}), 500
 
     return jsonify({"status": "received"})
 
 if __name__ == "__main__":
+    start_warmup()
     app.run(host="0.0.0.0", port=8000, debug=True) 
\ No newline at end of file